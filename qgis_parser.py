@@ -2,54 +2,124 @@
 # This script should be run with QGIS's Python interpreter
 # Example: /Applications/QGIS.app/Contents/MacOS/bin/python3 qgis_parser.py
 
-from qgis.core import QgsFeatureRequest, QgsVectorLayer, QgsVectorFileWriter
+from qgis.core import QgsFeatureRequest, QgsVectorLayer, QgsVectorFileWriter, QgsVectorDataProvider
+from qgis.core import QgsApplication, QgsProject, QgsLayerTreeLayer, QgsFields, QgsRectangle
+from qgis.core import QgsRenderContext, QgsExpression, QgsRuleBasedLabeling
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import sys
 import os
+from itertools import islice, repeat
 
-# Initialize QGIS application
-from qgis.core import QgsApplication
-QgsApplication.setPrefixPath("/Applications/QGIS.app/Contents/MacOS", True)
-qgs = QgsApplication([], False)
-qgs.initQgis()
-
-# Import other required QGIS modules
-from qgis.core import QgsProject
-from qgis.core import QgsVectorFileWriter
-
-# For debugging: print QGIS-related paths and environment variables
-print(f"QGIS Prefix path: {QgsApplication.prefixPath()}")
-print(f"QGIS Plugin path: {QgsApplication.pluginPath()}")
-print(f"PROJ_LIB environment variable: {os.environ.get('PROJ_LIB', 'Not set')}")
-
-# Attempt to manually set PROJ_LIB if not set
-if 'PROJ_LIB' not in os.environ:
-    potential_proj_paths = [
-        os.path.join(QgsApplication.prefixPath(), "share/proj"),
-        "/Applications/QGIS.app/Contents/Resources/proj"
-    ]
-    for path in potential_proj_paths:
-        if os.path.exists(path):
-            print(f"Setting PROJ_LIB to: {path}")
-            os.environ['PROJ_LIB'] = path
-            break
-
-# Load the QGIS project
+QGIS_PREFIX_PATH = "/Applications/QGIS.app/Contents/MacOS"
 project_path = 'data/dem_custom/data.qgs'
-print(f"Opening QGIS project: {project_path}")
-project = QgsProject.instance()
-if not project.read(project_path):
-    print(f"Failed to open QGIS project at {project_path}")
-    sys.exit(1)
-else:
+
+# Optional region of interest as (xmin, ymin, xmax, ymax) in the contour
+# layer's CRS; only contours intersecting it are exported
+REGION_OF_INTEREST = None
+
+# Print per-interval progress and debug details
+VERBOSE = False
+
+# FlatGeobuf writes far faster than GeoPackage and QGIS reads it natively;
+# switch to '.gpkg' if a GeoPackage is needed downstream
+OUTPUT_EXTENSION = '.fgb'
+
+# QGIS application of this process, created or borrowed on first use, and
+# whether this module created it (and therefore may exit it)
+qgs = None
+_owns_qgs = False
+
+def init_qgis():
+    """Initialize the QGIS application for this process and return it.
+    Repeated calls, or calls inside an already running QGIS, reuse the
+    existing application instead of loading providers again."""
+    global qgs, _owns_qgs
+    if qgs is not None:
+        return qgs
+    if QgsApplication.instance() is not None:
+        qgs = QgsApplication.instance()
+        _owns_qgs = False
+        return qgs
+
+    QgsApplication.setPrefixPath(QGIS_PREFIX_PATH, True)
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+    _owns_qgs = True
+
+    # For debugging: print QGIS-related paths and environment variables
+    if VERBOSE:
+        print(f"QGIS Prefix path: {QgsApplication.prefixPath()}")
+        print(f"QGIS Plugin path: {QgsApplication.pluginPath()}")
+        print(f"PROJ_LIB environment variable: {os.environ.get('PROJ_LIB', 'Not set')}")
+
+    # Attempt to manually set PROJ_LIB if not set
+    if 'PROJ_LIB' not in os.environ:
+        potential_proj_paths = [
+            os.path.join(QgsApplication.prefixPath(), "share/proj"),
+            "/Applications/QGIS.app/Contents/Resources/proj"
+        ]
+        for path in potential_proj_paths:
+            if os.path.exists(path):
+                if VERBOSE:
+                    print(f"Setting PROJ_LIB to: {path}")
+                os.environ['PROJ_LIB'] = path
+                break
+
+    return qgs
+
+def exit_qgis():
+    """Exit the QGIS application if init_qgis() created it. A borrowed
+    application (e.g. a running QGIS) is left untouched."""
+    global qgs, _owns_qgs
+    if qgs is not None and _owns_qgs:
+        qgs.exitQgis()
+    qgs = None
+    _owns_qgs = False
+
+def load_project(project_path: str):
+    """Load the QGIS project into the global project instance, or into a
+    separate project when running inside a borrowed QGIS application so the
+    user's open project is left alone"""
+    print(f"Opening QGIS project: {project_path}")
+    project = QgsProject.instance() if _owns_qgs else QgsProject()
+    if not project.read(project_path):
+        print(f"Failed to open QGIS project at {project_path}")
+        return None
+
     print("Project opened successfully")
-    print(f"Project title: {project.title()}")
-    print("Layers in project:")
-    for layer_id, layer in project.mapLayers().items():
-        print(f"  - {layer.name()} ({layer.type()}) - {layer_id}")
+    if VERBOSE:
+        print(f"Project title: {project.title()}")
+        print("Layers in project:")
+        for layer_id, layer in project.mapLayers().items():
+            print(f"  - {layer.name()} ({layer.type()}) - {layer_id}")
+    return project
+
+# Number of features handed to the writer per addFeatures() call. This only
+# cuts down Python->C++ calls (the writer manages its own transaction), so it
+# is kept small to avoid holding many geometries in memory at once
+WRITE_BATCH_SIZE = 2048
+
+# Above this many candidate elevations the IN list is no cheaper than modulo
+MAX_IN_VALUES = 10000
 
-def filter_contours_from_project(project, output_path: str, interval: int):
-    """Filter contour lines to keep every nth meter using a layer from the project.
-    Returns the created layer without adding it to the original project."""
+def ensure_elevation_index(layer, field_name: str):
+    """Create an attribute index on the elevation field so the provider can
+    skip non-matching rows when filtering by elevation."""
+    provider = layer.dataProvider()
+    if not provider.capabilities() & QgsVectorDataProvider.CreateAttributeIndex:
+        print(f"Provider '{provider.name()}' cannot create attribute indexes, skipping")
+        return
+    
+    field_idx = layer.fields().indexOf(field_name)
+    if provider.createAttributeIndex(field_idx):
+        print(f"Created attribute index on '{field_name}'")
+    else:
+        print(f"Warning: Could not create attribute index on '{field_name}'")
+
+def discover_contour_layer(project):
+    """Find the original contour layer in the project and its elevation field.
+    Returns a (layer, field_name) tuple."""
     # Find the contour layer in the project - be more specific to get the original layer
     contour_layer = None
     
@@ -77,119 +147,266 @@ def filter_contours_from_project(project, output_path: str, interval: int):
             print(f"  - {layer.name()} ({layer.type()})")
         raise ValueError("No original contour layer found in project")
     
-    print(f"\nProcessing layer: {contour_layer.name()}")
-    print(f"Output file: {output_path}")
-    
     # Print all available fields for debugging
-    print("\nAvailable fields in layer:")
-    for field in contour_layer.fields():
-        print(f"Field: {field.name()}, Type: {field.typeName()}")
+    fields = list(contour_layer.fields())
+    if VERBOSE:
+        print("\nAvailable fields in layer:")
+        for field in fields:
+            print(f"Field: {field.name()}, Type: {field.typeName()}")
 
     # Check for elevation field
     field_name = None
-    for field in contour_layer.fields():
+    for field in fields:
         if field.name().lower() in ['elevation', 'contour', 'elev', 'level']:
             field_name = field.name()
             break
 
     if not field_name:
         print("\nWarning: No elevation field found. Available fields are:", 
-              [field.name() for field in contour_layer.fields()])
+              [field.name() for field in fields])
         raise ValueError("No elevation field found in layer")
     
     print(f"\nUsing field '{field_name}' as elevation field")
+    return contour_layer, field_name
 
-    # Build filter expression
+def distinct_elevations(layer, field_name: str):
+    """Return the sorted distinct numeric elevations of the layer, queried from
+    the provider in a single pass (e.g. SELECT DISTINCT for GPKG)"""
+    field_idx = layer.fields().indexOf(field_name)
+    elevations = []
+    for value in layer.uniqueValues(field_idx):
+        try:
+            elevations.append(float(value))
+        except (TypeError, ValueError):
+            continue
+    return sorted(elevations)
+
+def interval_elevations(elevations, interval: int):
+    """Select the elevations that are multiples of interval"""
+    return [elevation for elevation in elevations if elevation % interval == 0]
+
+def interval_filter_expression(field_name: str, interval: int, elevations=None):
+    """Build the filter keeping elevations that are multiples of interval.
+    Returns a (subset_sql, expression) pair: the first is pushed down to the
+    provider, the second is for the QGIS expression engine.
+
+    With the matching elevations known up front they are listed explicitly, so
+    the provider can answer the filter from the attribute index instead of
+    evaluating a predicate on every row. Otherwise the provider gets a
+    float-safe multiple test, because SQLite's % truncates both operands to
+    integers and would also match e.g. 12.5 for a 12m interval."""
+    if elevations is not None and len(elevations) <= MAX_IN_VALUES:
+        values = ", ".join(repr(elevation) for elevation in elevations)
+        expr = f'"{field_name}" IN ({values})'
+        return expr, expr
+    subset_sql = f'"{field_name}" = CAST("{field_name}" / {interval} AS INTEGER) * {interval}'
     expr = f'"{field_name}" % {interval} = 0'
-    print(f"Filter expression: {expr}")
+    return subset_sql, expr
+
+def remove_output(output_path: str, driver_name: str):
+    """Delete an output file (and a shapefile's sidecar files) if it exists"""
+    if driver_name == 'ESRI Shapefile':
+        QgsVectorFileWriter.deleteShapeFile(output_path)
+    elif os.path.exists(output_path):
+        os.remove(output_path)
+
+def export_interval(contour_layer, field_name: str, output_path: str, interval: int,
+                    elevations=None, bbox: QgsRectangle = None, style_fields=None):
+    """Filter contour lines to keep every nth meter of an already discovered layer
+    and write them to output_path. If bbox is given, only contours intersecting
+    it are kept. Only the elevation and the fields named in style_fields are
+    written. Returns the number of features written, or None if nothing was
+    written."""
+    if VERBOSE:
+        print(f"\nProcessing layer: {contour_layer.name()}")
+        print(f"Output file: {output_path}")
+
+    # Build filter expression so it can be pushed down to the data source
+    subset_sql, expr = interval_filter_expression(field_name, interval, elevations)
+    if VERBOSE:
+        print(f"Filter expression: {subset_sql}")
 
-    # Check if any features match the filter
-    matching_count = 0
-    for _ in contour_layer.getFeatures(QgsFeatureRequest().setFilterExpression(expr)):
-        matching_count += 1
-    
-    print(f"Found {matching_count} features matching the filter expression")
-    
-    if matching_count == 0:
-        print("Warning: No features match the filter criteria. Check your interval value.")
-        return None
-        
     # Determine the file format based on file extension
     file_ext = os.path.splitext(output_path)[1].lower()
     
     if file_ext == '.gpkg':
         driver_name = 'GPKG'
+    elif file_ext == '.fgb':
+        driver_name = 'FlatGeobuf'
     elif file_ext in ['.shp', '.shx', '.dbf']:
         driver_name = 'ESRI Shapefile'
     else:
         print(f"Warning: Unrecognized file extension '{file_ext}'. Defaulting to GeoPackage format.")
         driver_name = 'GPKG'
     
-    print(f"Using driver: {driver_name}")
+    if VERBOSE:
+        print(f"Using driver: {driver_name}")
     
-    # Create a memory layer with filtered features
-    print("Creating temporary memory layer with filtered features...")
-    memory_layer = QgsVectorLayer(f"LineString?crs={contour_layer.crs().authid()}", "filtered_contours", "memory")
-    memory_layer.setCrs(contour_layer.crs())
+    # Only the elevation and the fields the copied style reads are carried
+    # over to the output
+    source_fields = contour_layer.fields()
+    field_indices = [source_fields.indexOf(field_name)]
+    for name in style_fields or []:
+        idx = source_fields.indexOf(name)
+        if idx >= 0 and idx not in field_indices:
+            field_indices.append(idx)
+    output_fields = QgsFields()
+    for idx in field_indices:
+        output_fields.append(source_fields.at(idx))
     
-    # Set up the fields
-    memory_layer.startEditing()
-    for field in contour_layer.fields():
-        memory_layer.addAttribute(field)
-    memory_layer.commitChanges()
+    # Stream the filtered features straight into the output file
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = driver_name
+    options.fileEncoding = "UTF-8"
+    if driver_name == 'GPKG':
+        # Build the R-tree once after the bulk load instead of per insert
+        options.layerOptions = ['SPATIAL_INDEX=NO']
+    writer = QgsVectorFileWriter.create(
+        output_path,
+        output_fields,
+        contour_layer.wkbType(),
+        contour_layer.crs(),
+        contour_layer.transformContext(),
+        options
+    )
     
-    # Add filtered features
-    memory_layer.startEditing()
-    for feature in contour_layer.getFeatures(QgsFeatureRequest().setFilterExpression(expr)):
-        memory_layer.addFeature(feature)
-    memory_layer.commitChanges()
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        print(f"Error saving filtered contours: {writer.errorMessage()}")
+        return None
     
-    print(f"Created memory layer with {memory_layer.featureCount()} features")
+    # Let the provider evaluate the filter (e.g. as a SQLite WHERE clause for
+    # GPKG) and fall back to the expression engine if it refuses the subset
+    original_subset = contour_layer.subsetString()
+    subset = f"({original_subset}) AND ({subset_sql})" if original_subset else subset_sql
+    pushed_down = contour_layer.setSubsetString(subset)
+    if pushed_down:
+        request = QgsFeatureRequest()
+    else:
+        print("Provider rejected the subset string, filtering with the expression engine")
+        request = QgsFeatureRequest().setFilterExpression(expr)
+    request.setSubsetOfAttributes(field_indices)
+    # A filter rect lets the provider use its spatial index
+    if bbox is not None:
+        request.setFilterRect(bbox)
     
-    # Save the memory layer to file
-    error = QgsVectorFileWriter.writeAsVectorFormat(
-        memory_layer,
-        output_path,
-        "UTF-8",
-        memory_layer.crs(),
-        driver_name
-    )
+    matching_count = 0
+    write_error = None
+    try:
+        features = contour_layer.getFeatures(request)
+        while True:
+            batch = list(islice(features, WRITE_BATCH_SIZE))
+            if not batch:
+                break
+            # Match the output field layout
+            for feature in batch:
+                feature.setAttributes([feature.attribute(idx) for idx in field_indices])
+            if not writer.addFeatures(batch):
+                write_error = writer.errorMessage()
+                break
+            matching_count += len(batch)
+    finally:
+        if pushed_down:
+            contour_layer.setSubsetString(original_subset)
+    
+    if write_error is None and writer.hasError() != QgsVectorFileWriter.NoError:
+        write_error = writer.errorMessage()
+    
+    # Deleting the writer flushes and closes the output file
+    del writer
+    
+    if write_error is not None:
+        print(f"Error saving filtered contours: {write_error}")
+        remove_output(output_path, driver_name)
+        return None
+    
+    if VERBOSE:
+        print(f"Found {matching_count} features matching the filter expression")
+    
+    if matching_count == 0:
+        print("Warning: No features match the filter criteria. Check your interval value.")
+        remove_output(output_path, driver_name)
+        return None
+    
+    if driver_name == 'GPKG':
+        output_layer = QgsVectorLayer(output_path, "filtered_contours", "ogr")
+        if not output_layer.dataProvider().createSpatialIndex():
+            print(f"Warning: Could not create spatial index for {output_path}")
+        del output_layer
     
-    # More detailed error handling
-    if isinstance(error, tuple) and len(error) >= 1 and error[0] == QgsVectorFileWriter.NoError:
+    if VERBOSE:
         print(f"Successfully saved filtered contours to {output_path}")
-        
-        # Create a new vector layer from the saved file
-        new_layer = QgsVectorLayer(output_path, f"Contours {interval}m", "ogr")
-        
-        if not new_layer.isValid():
-            print(f"Error: Failed to load layer from {output_path}")
-            return None
-        
-        # Copy style from original contour layer if available
-        try:
-            # Check if we can access the style manager
-            style_manager = contour_layer.styleManager()
-            
-            # Try different approaches to copy the style
-            if hasattr(contour_layer, 'renderer'):
-                renderer = contour_layer.renderer().clone()
-                new_layer.setRenderer(renderer)
+    return matching_count
+
+def clone_contour_style(contour_layer):
+    """Clone the renderer and labeling of the original contour layer once so
+    they can be shared by all interval layers. Returns (renderer, labeling),
+    either of which may be None."""
+    renderer = None
+    labeling = None
+    try:
+        if hasattr(contour_layer, 'renderer') and contour_layer.renderer() is not None:
+            renderer = contour_layer.renderer().clone()
+        if hasattr(contour_layer, 'labeling') and contour_layer.labeling() is not None:
+            labeling = contour_layer.labeling().clone()
+    except Exception as e:
+        print(f"Warning: Could not copy style: {e}")
+    return renderer, labeling
+
+def style_field_names(contour_layer, renderer=None, labeling=None):
+    """Return the names of the source fields read by the cloned renderer and
+    labeling, so the interval outputs can keep them"""
+    source_names = contour_layer.fields().names()
+    context = QgsRenderContext()
+    names = set()
+    try:
+        if renderer is not None:
+            names.update(renderer.usedAttributes(context))
+        if labeling is not None:
+            for provider_id in labeling.subProviders():
+                names.update(labeling.settings(provider_id).referencedFields(context))
+            # Rule filters are not part of the per-rule label settings
+            if isinstance(labeling, QgsRuleBasedLabeling):
+                for rule in labeling.rootRule().descendants():
+                    if rule.filterExpression():
+                        names.update(QgsExpression(rule.filterExpression()).referencedColumns())
+    except Exception as e:
+        print(f"Warning: Could not determine style fields, keeping all fields: {e}")
+        return source_names
+    
+    if QgsFeatureRequest.ALL_ATTRIBUTES in names:
+        return source_names
+    return [name for name in source_names if name in names]
+
+def load_interval_layer(output_path: str, interval: int, renderer=None, labeling=None):
+    """Load an exported interval file as a layer styled with the shared style
+    from clone_contour_style(). Returns the created layer without adding it to
+    the original project."""
+    # Create a new vector layer from the saved file
+    new_layer = QgsVectorLayer(output_path, f"Contours {interval}m", "ogr")
+    
+    if not new_layer.isValid():
+        print(f"Error: Failed to load layer from {output_path}")
+        return None
+    
+    # Every layer takes ownership of its renderer and labeling, so each one
+    # gets its own copy of the shared style
+    try:
+        if renderer is not None:
+            new_layer.setRenderer(renderer.clone())
+            if VERBOSE:
                 print("Applied style from original contour layer using renderer clone")
-            # Try to copy labeling settings if available
-            if hasattr(contour_layer, 'labeling') and contour_layer.labeling() is not None:
-                new_layer.setLabeling(contour_layer.labeling().clone())
+        if labeling is not None:
+            new_layer.setLabeling(labeling.clone())
+            if VERBOSE:
                 print("Applied labeling from original contour layer")
-            else:
-                print("No compatible style method found - using default style")
-        except Exception as e:
-            print(f"Warning: Could not copy style: {e}")
-        
+        elif VERBOSE:
+            print("No compatible style method found - using default style")
+    except Exception as e:
+        print(f"Warning: Could not copy style: {e}")
+    
+    if VERBOSE:
         print(f"Created layer: {new_layer.name()}")
-        return new_layer
-    else:
-        print(f"Error saving filtered contours: {error}")
-        return None
+    return new_layer
 
 def organize_layers_in_project(project, layers):
     """Organize the contour layers in a group in the project"""
@@ -209,66 +426,171 @@ def organize_layers_in_project(project, layers):
     if not filtered_contours_group:
         filtered_contours_group = root.addGroup("Filtered Contours")
     
-    # Move layers to the group
-    for layer in layers:
-        layer_node = root.findLayer(layer.id())
-        if layer_node:
-            clone = layer_node.clone()
-            filtered_contours_group.addChildNode(clone)
-            root.removeChildNode(layer_node)
-            print(f"Added layer {layer.name()} to 'Filtered Contours' group")
-    
-    print("Layers organized in 'Filtered Contours' group")
-
-# Usage:
-try:
-    # Create output directory for contour layers
-    output_dir = 'output_contours'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
-    
-    # Create a copy of the original project to avoid modifying it
-    new_project = QgsProject()
-    new_project.read(project_path)
-    print("Created a new project instance from the original project")
-    
-    # Create contour files for 1m through 10m intervals
-    added_layers = []
-    for interval in range(12, 13):
-        output_path = os.path.join(output_dir, f'contour_lines_{interval}m.gpkg')
+    # Add all layers to the group in a single tree mutation. The layers are
+    # expected to be registered with addToLegend=False, so there are no
+    # existing nodes to move.
+    filtered_contours_group.insertChildNodes(-1, [QgsLayerTreeLayer(layer) for layer in layers])
+    print(f"Added {len(layers)} layers to 'Filtered Contours' group")
+
+# Contour layer and elevation field resolved by an interval export worker
+_worker_source = None
+
+def _init_interval_worker(project_path: str):
+    """Initialize QGIS and resolve the contour layer once per worker process"""
+    global _worker_source
+    init_qgis()
+    project = load_project(project_path)
+    if project is None:
+        raise RuntimeError(f"Failed to open QGIS project at {project_path}")
+    _worker_source = discover_contour_layer(project)
+
+def _export_interval_worker(output_path: str, interval: int, elevations=None, region=None,
+                            style_fields=None):
+    """Export one interval in a worker process. Returns (interval, output_path, count)."""
+    contour_layer, field_name = _worker_source
+    bbox = QgsRectangle(*region) if region is not None else None
+    if VERBOSE:
         print(f"\n===== Processing {interval}m interval contours =====")
-        new_layer = filter_contours_from_project(
-            project=project,  # Read from original project
-            output_path=output_path,
-            interval=interval
-        )
-        if new_layer:
-            # Add new layer to the new project instance
-            new_project.addMapLayer(new_layer)
-            added_layers.append(new_layer)
-    
-    print("\nAll filter operations completed successfully")
-    print(f"Added {len(added_layers)} layers to the new project")
-    
-    # Organize layers in the new project
-    organize_layers_in_project(new_project, added_layers)
-    
-    # Save the new project with a different name
-    new_project_path = 'data/dem_custom/filtered_contours_project.qgs'
-    if new_project.write(new_project_path):
-        print(f"New project saved as {new_project_path}")
-    else:
-        print("Failed to save new project")
-    
-    # The original project remains unchanged
-    print("Original project remains unchanged")
-except Exception as e:
-    print(f"Error during filtering: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Clean up
-print("Exiting QGIS...")
-qgs.exitQgis()
-print("Done.")
+    count = export_interval(
+        contour_layer=contour_layer,
+        field_name=field_name,
+        output_path=output_path,
+        interval=interval,
+        elevations=elevations,
+        bbox=bbox,
+        style_fields=style_fields
+    )
+    return interval, output_path, count
+
+def main():
+    init_qgis()
+    project = load_project(project_path)
+    if project is None:
+        sys.exit(1)
+
+    try:
+        # Create output directory for contour layers
+        output_dir = 'output_contours'
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            print(f"Created output directory: {output_dir}")
+        
+        # Create a copy of the original project to avoid modifying it
+        new_project = QgsProject()
+        new_project.read(project_path)
+        print("Created a new project instance from the original project")
+        
+        # Resolve the source layer once and index it before any worker reads it
+        contour_layer, field_name = discover_contour_layer(project)  # Read from original project
+        ensure_elevation_index(contour_layer, field_name)
+        
+        # Read the distinct elevations once; each interval's matching values
+        # are then derived in memory instead of rescanning the source
+        elevations = distinct_elevations(contour_layer, field_name)
+        print(f"Found {len(elevations)} distinct elevations")
+        
+        # A filter rect only pays off when the region does not already cover
+        # the whole layer. Decide once, while the layer has no interval subset,
+        # since a subset string drops the cached extent and recomputing it
+        # reads every matching feature.
+        region = REGION_OF_INTEREST
+        if region is not None and QgsRectangle(*region).contains(contour_layer.extent()):
+            region = None
+        
+        # Clone the style before exporting so the outputs keep the fields it
+        # reads; otherwise its categories, rules and labels find nothing
+        shared_renderer, shared_labeling = clone_contour_style(contour_layer)
+        style_fields = style_field_names(contour_layer, shared_renderer, shared_labeling)
+        if VERBOSE:
+            print(f"Fields used by the contour style: {style_fields}")
+        
+        # Create contour files for 1m through 10m intervals. Every interval reads
+        # the same source and writes its own file, so batches of intervals run
+        # in parallel processes, each with its own QGIS instance.
+        intervals = []
+        matching_elevations = []
+        for interval in range(12, 13):
+            values = interval_elevations(elevations, interval)
+            if not values:
+                print(f"Warning: No elevations are multiples of {interval}m, skipping")
+                continue
+            intervals.append(interval)
+            matching_elevations.append(values)
+        output_paths = [os.path.join(output_dir, f'contour_lines_{interval}m{OUTPUT_EXTENSION}') for interval in intervals]
+        
+        results = []
+        if len(intervals) <= 1 or not _owns_qgs:
+            # A single interval does not pay for a worker's QGIS start-up, and
+            # inside a host application spawn would relaunch the host binary
+            # rather than python, so export in this process
+            bbox = QgsRectangle(*region) if region is not None else None
+            for interval, output_path, values in zip(intervals, output_paths, matching_elevations):
+                count = export_interval(
+                    contour_layer=contour_layer,
+                    field_name=field_name,
+                    output_path=output_path,
+                    interval=interval,
+                    elevations=values,
+                    bbox=bbox,
+                    style_fields=style_fields
+                )
+                results.append((interval, output_path, count))
+        else:
+            max_workers = min(len(intervals), os.cpu_count() or 1)
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_interval_worker,
+                initargs=(project_path,)
+            ) as executor:
+                results = list(executor.map(
+                    _export_interval_worker,
+                    output_paths,
+                    intervals,
+                    matching_elevations,
+                    repeat(region),
+                    repeat(style_fields)
+                ))
+        
+        # Layer creation and project edits stay in this process
+        added_layers = []
+        for interval, output_path, count in results:
+            if not count:
+                continue
+            new_layer = load_interval_layer(output_path, interval, shared_renderer, shared_labeling)
+            if new_layer:
+                added_layers.append(new_layer)
+        
+        # Register all new layers with the new project instance at once,
+        # leaving legend placement to organize_layers_in_project
+        new_project.addMapLayers(added_layers, False)
+        
+        print("\nAll filter operations completed successfully")
+        print("Features per interval: " + ", ".join(
+            f"{interval}m: {count or 0}" for interval, _, count in results))
+        print(f"Added {len(added_layers)} layers to the new project")
+        
+        # Organize layers in the new project
+        organize_layers_in_project(new_project, added_layers)
+        
+        # Save the new project with a different name
+        new_project_path = 'data/dem_custom/filtered_contours_project.qgs'
+        if new_project.write(new_project_path):
+            print(f"New project saved as {new_project_path}")
+        else:
+            print("Failed to save new project")
+        
+        # The original project remains unchanged
+        print("Original project remains unchanged")
+    except Exception as e:
+        print(f"Error during filtering: {e}")
+        import traceback
+        traceback.print_exc()
+
+    # Clean up
+    print("Exiting QGIS...")
+    exit_qgis()
+    print("Done.")
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,18 @@ import os
 import subprocess
 from pathlib import Path
 
+# Compile in-process when PyQt5's resource compiler is importable, which saves
+# launching a separate pyrcc5 process
+try:
+    from PyQt5.pyrcc_main import processResourceFile
+except ImportError:
+    processResourceFile = None
+
 def compile_resources():
     """
-    Compiles the resources.qrc file into resources.py using the pyrcc5 tool.
+    Compiles the resources.qrc file into resources.py in-process with
+    PyQt5.pyrcc_main, falling back to the pyrcc5 tool when that module is
+    not available.
     This should be run whenever the resources.qrc file is updated.
     """
     qrc_file = Path(__file__).parent / "resources.qrc"
@@ -18,6 +27,21 @@ def compile_resources():
         print(f"Error: {qrc_file} not found!")
         return False
     
+    if processResourceFile is not None:
+        print(f"Compiling {qrc_file} in-process")
+        if processResourceFile([str(qrc_file)], str(py_file), False):
+            print(f"Successfully compiled resources to {py_file}")
+            return True
+        print("Error compiling resources")
+        return False
+    
+    return compile_resources_subprocess(qrc_file, py_file)
+
+def compile_resources_subprocess(qrc_file, py_file):
+    """
+    Compiles the resources by running an external pyrcc5 executable.
+    Used when PyQt5.pyrcc_main cannot be imported.
+    """
     # Use the full path to pyrcc5 in QGIS's installation
     pyrcc5_path = "/Users/hamarmiklos/Desktop/programok/projects/aru/run_pyrcc.sh"
     